@@ -1,8 +1,132 @@
-import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 from contextlib import contextmanager
+import atexit
+import functools
 import logging
+import threading
+import uuid
+
+# Number of executions of the same SQL after which psycopg prepares it
+# server side. 0 prepares on first use, None disables preparation.
+PREPARE_THRESHOLD = 5
+
+# Prepared statements kept per connection; the least recently used one is
+# deallocated on the server once the limit is reached.
+PREPARED_MAX = 256
+
+# Server settings applied to every new connection. Short LLM-generated
+# queries gain nothing from JIT, and the timeout stops a runaway query from
+# holding a pooled backend indefinitely.
+SESSION_SETTINGS = {
+    "jit": "off",
+    "statement_timeout": "30s",
+    "application_name": "rag-neo4j",
+}
+
+# Pools shared by every DB instance with the same server, database, user and
+# pool settings: key -> [ConnectionPool, number of DB instances using it].
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _conninfo(db_config):
+    """
+    Build a libpq connection string from a DB configuration dictionary.
+    """
+    return make_conninfo(
+        dbname=db_config["dbname"],
+        user=db_config["user"],
+        password=db_config["password"],
+        host=db_config["host"],
+        port=db_config["port"],
+    )
+
+
+def session_options(settings=None, options=None):
+    """
+    Render server settings as a libpq ``options`` string of ``-c`` flags.
+
+    Sending them at connect time avoids a SET round trip per connection.
+    An existing ``options`` string, e.g. from a database URL, is kept and
+    placed last so its own flags win over these defaults.
+    """
+    settings = SESSION_SETTINGS if settings is None else settings
+    flags = [f"-c {_escape_option(name)}={_escape_option(value)}" for name, value in settings.items()]
+    if options:
+        flags.append(options)
+    return " ".join(flags)
+
+
+def _escape_option(value):
+    """
+    Escape backslashes and spaces as libpq requires inside ``options``.
+    """
+    return str(value).replace("\\", "\\\\").replace(" ", "\\ ")
+
+
+def _connection_kwargs(db_config):
+    """
+    Keyword arguments passed to ``psycopg.Connection.connect`` for each pooled connection.
+
+    Everything that is not a ``connect`` parameter ends up in the libpq
+    connection string, so only valid libpq options may appear here.
+    """
+    return {
+        "prepare_threshold": db_config.get("prepare_threshold", PREPARE_THRESHOLD),
+        "row_factory": dict_row,
+        "keepalives": 1,
+        "keepalives_idle": db_config.get("keepalives_idle", 30),
+        "options": session_options({**SESSION_SETTINGS, **db_config.get("session_settings", {})}),
+    }
+
+
+def _configure_connection(conn, prepared_max):
+    """
+    Set per-connection attributes that libpq does not know about.
+
+    This runs once per new pooled connection and issues no query.
+    """
+    conn.prepared_max = prepared_max
+
+
+def _pool_key(db_config):
+    """
+    Key identifying the shared pool for a DB configuration dictionary.
+
+    Sizing and connection settings are part of the key, so a configuration
+    that differs in any of them (e.g. one from ``DB.autotune``) gets its own
+    pool instead of silently reusing one built with other settings.
+    """
+    return (
+        db_config["host"],
+        str(db_config["port"]),
+        db_config["dbname"],
+        db_config["user"],
+        db_config.get("minconn", 1),
+        db_config.get("maxconn", 10),
+        db_config.get("prepare_threshold", PREPARE_THRESHOLD),
+        db_config.get("prepared_max", PREPARED_MAX),
+        db_config.get("keepalives_idle", 30),
+        tuple(sorted(db_config.get("session_settings", {}).items())),
+    )
+
+
+def _close_pools():
+    """
+    Close every shared pool still open, once, at process exit.
+    """
+    with _POOLS_LOCK:
+        pools = [pool for pool, _ in _POOLS.values()]
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(_close_pools)
 
 
 class DB:
@@ -20,8 +144,17 @@ class DB:
                               "host": "localhost",
                               "port": "5432",
                               "minconn": 1,
-                              "maxconn": 10
+                              "maxconn": 10,
+                              "prepare_threshold": 5,
+                              "prepared_max": 256,
+                              "keepalives_idle": 30,
+                              "pool_timeout": 30,
+                              "session_settings": {"statement_timeout": "60s"}
                           }
+
+        Pool throughput usually peaks somewhere around 25-50 connections and
+        degrades beyond that; see ``autotune`` to size ``maxconn`` from the
+        server's ``max_connections``.
         """
         self.db_config = db_config
         self._pool = None
@@ -31,41 +164,104 @@ class DB:
     def _setup_logging(self):
         """
         Set up logging for database operations.
+
+        Handlers and levels are left to the application.
         """
-        logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("DB")
 
     def _initialize_connection_pool(self):
         """
-        Initialize a connection pool with psycopg2.
+        Initialize a connection pool with psycopg.
+
+        Connections prepare repeated statements server side once they have
+        been executed ``prepare_threshold`` times. psycopg keeps those
+        statements per physical connection, keyed by SQL text, so they survive
+        checkouts from the pool. The ``configure`` callback caps each
+        connection at ``prepared_max`` statements; beyond that the least
+        recently used one is deallocated.
+
+        DB instances with the same host, port, dbname, user and pool settings
+        share one pool.
         """
+        self._pool_key = _pool_key(self.db_config)
         try:
-            self._pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=self.db_config.get("minconn", 1),
-                maxconn=self.db_config.get("maxconn", 10),
-                dbname=self.db_config["dbname"],
-                user=self.db_config["user"],
-                password=self.db_config["password"],
-                host=self.db_config["host"],
-                port=self.db_config["port"],
-            )
-            self.logger.info("Connection pool initialized successfully.")
+            with _POOLS_LOCK:
+                entry = _POOLS.get(self._pool_key)
+                created = entry is None
+                if created:
+                    entry = _POOLS[self._pool_key] = [self._create_pool(), 0]
+                entry[1] += 1
+                self._pool = entry[0]
+            if created:
+                self.logger.info("Connection pool initialized successfully.")
         except Exception as e:
-            self.logger.error(f"Failed to initialize connection pool: {e}")
+            self.logger.error("Failed to initialize connection pool: %s", e)
+            self.close()
             raise
 
-    @contextmanager
+    def _create_pool(self):
+        """
+        Open a new psycopg connection pool for this configuration.
+
+        One direct connection is made first, so a bad configuration fails
+        immediately with libpq's own error instead of a pool timeout. The pool
+        is then waited on until its ``minconn`` connections are ready.
+        """
+        with psycopg.connect(_conninfo(self.db_config), **_connection_kwargs(self.db_config)) as conn:
+            server_max = int(conn.execute("SHOW max_connections").fetchone()["max_connections"])
+        self._check_pool_size(server_max)
+        pool = ConnectionPool(
+            _conninfo(self.db_config),
+            min_size=self.db_config.get("minconn", 1),
+            max_size=self.db_config.get("maxconn", 10),
+            kwargs=_connection_kwargs(self.db_config),
+            configure=functools.partial(
+                _configure_connection,
+                prepared_max=self.db_config.get("prepared_max", PREPARED_MAX),
+            ),
+            open=True,
+        )
+        try:
+            pool.wait(timeout=self.db_config.get("pool_timeout", 30))
+        except Exception:
+            pool.close()
+            raise
+        return pool
+
+    def _check_pool_size(self, server_max):
+        """
+        Warn when the pool may claim most of the server's connection slots.
+        """
+        maxconn = self.db_config.get("maxconn", 10)
+        if maxconn > server_max * 0.8:
+            self.logger.warning(
+                "maxconn=%s exceeds 80%% of the server's max_connections=%s", maxconn, server_max
+            )
+
+    @classmethod
+    def autotune(cls, db_config, target_concurrency):
+        """
+        Create a DB whose pool size is derived from the expected concurrency.
+
+        Args:
+        db_config (dict): A dictionary containing database configuration.
+        target_concurrency (int): Number of callers expected to query at once.
+
+        Returns:
+        DB: An instance with ``maxconn`` capped at half of the server's
+            ``max_connections``.
+        """
+        with psycopg.connect(_conninfo(db_config)) as conn:
+            server_max = int(conn.execute("SHOW max_connections").fetchone()[0])
+        maxconn = max(1, min(target_concurrency, server_max // 2))
+        minconn = min(db_config.get("minconn", 1), maxconn)
+        return cls({**db_config, "minconn": minconn, "maxconn": maxconn})
+
     def _get_connection(self):
         """
         Context manager to get a connection from the pool.
         """
-        conn = None
-        try:
-            conn = self._pool.getconn()
-            yield conn
-        finally:
-            if conn:
-                self._pool.putconn(conn)
+        return self._pool.connection()
 
     @contextmanager
     def _get_cursor(self, connection):
@@ -74,38 +270,71 @@ class DB:
         """
         cursor = None
         try:
-            cursor = connection.cursor(cursor_factory=RealDictCursor)
+            cursor = connection.cursor()
             yield cursor
         finally:
             if cursor:
                 cursor.close()
 
-    def execute_query(self, query, params=None):
+    def execute_query(self, query, params=None, prepare=None):
         """
         Execute a SQL query and return results.
 
         Args:
         query (str): The SQL query string.
         params (tuple or list): Parameters for the query.
+        prepare (bool): True to prepare the query immediately, False to never
+                        prepare it, None to follow ``prepare_threshold``.
 
         Returns:
         list: Query results as a list of dictionaries.
         """
         results = []
         with self._get_connection() as conn:
-            with self._get_cursor(conn) as cursor:
+            try:
+                self.logger.info("Executing query: %s", query)
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("Query parameters: %r", params)
+                cursor = conn.execute(query, params, prepare=prepare)
+                if cursor.description:
+                    results = cursor.fetchall()
+            except Exception as e:
+                self.logger.error("Query execution failed: %s", e)
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+        return results
+
+    def iter_query(self, query, params=None, itersize=1000):
+        """
+        Execute a SQL query and yield results through a server-side cursor.
+
+        Rows are fetched ``itersize`` at a time, so large results never have
+        to fit in memory at once. The connection stays checked out until the
+        generator is exhausted or closed.
+
+        Args:
+        query (str): The SQL query string.
+        params (tuple or list): Parameters for the query.
+        itersize (int): Number of rows fetched from the server per round trip.
+
+        Yields:
+        dict: One query result row.
+        """
+        with self._get_connection() as conn:
+            with conn.cursor(name=f"srv_{uuid.uuid4().hex}") as cursor:
                 try:
-                    self.logger.info(f"Executing query: {query}")
+                    self.logger.info("Streaming query: %s", query)
+                    cursor.itersize = itersize
                     cursor.execute(query, params)
-                    if cursor.description:
-                        results = cursor.fetchall()
+                    yield from cursor
                 except Exception as e:
-                    self.logger.error(f"Query execution failed: {e}")
+                    self.logger.error("Query streaming failed: %s", e)
                     conn.rollback()
                     raise
                 else:
                     conn.commit()
-        return results
 
     def execute_non_query(self, query, params=None):
         """
@@ -118,25 +347,132 @@ class DB:
         with self._get_connection() as conn:
             with self._get_cursor(conn) as cursor:
                 try:
-                    self.logger.info(f"Executing non-query: {query}")
+                    self.logger.info("Executing non-query: %s", query)
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug("Non-query parameters: %r", params)
                     cursor.execute(query, params)
                     conn.commit()
                 except Exception as e:
-                    self.logger.error(f"Non-query execution failed: {e}")
+                    self.logger.error("Non-query execution failed: %s", e)
+                    conn.rollback()
+                    raise
+
+    def execute_many(self, query, seq_of_params):
+        """
+        Execute a non-select SQL query once per parameter set in a single batch.
+
+        Args:
+        query (str): The SQL query string.
+        seq_of_params (iterable): Parameter tuples or lists, one per execution.
+        """
+        with self._get_connection() as conn:
+            with self._get_cursor(conn) as cursor:
+                try:
+                    self.logger.info("Executing batch: %s", query)
+                    cursor.executemany(query, seq_of_params)
+                    conn.commit()
+                except Exception as e:
+                    self.logger.error("Batch execution failed: %s", e)
+                    conn.rollback()
+                    raise
+
+    def copy_from(self, table, columns, rows):
+        """
+        Bulk load rows into a table with COPY FROM STDIN.
+
+        Args:
+        table (str or tuple): The target table name, or its name parts for a
+                              qualified name, e.g. ("public", "customer").
+        columns (list): Column names matching the order of values in each row.
+        rows (iterable): Row tuples or lists to load.
+        """
+        parts = table if isinstance(table, tuple) else (table,)
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(*parts),
+            sql.SQL(", ").join(map(sql.Identifier, columns)),
+        )
+        with self._get_connection() as conn:
+            with self._get_cursor(conn) as cursor:
+                try:
+                    self.logger.info("Copying rows into: %s", table)
+                    # Bulk loads can be replayed, so skip waiting on the WAL flush.
+                    cursor.execute("SET LOCAL synchronous_commit = off")
+                    # One COPY stays active for the whole stream; lift the pool's timeout.
+                    cursor.execute("SET LOCAL statement_timeout = 0")
+                    with cursor.copy(statement) as copy:
+                        for row in rows:
+                            copy.write_row(row)
+                    conn.commit()
+                except Exception as e:
+                    self.logger.error("Copy into %s failed: %s", table, e)
                     conn.rollback()
                     raise
 
+    @contextmanager
+    def pipeline(self):
+        """
+        Context manager yielding a pooled connection in pipeline mode.
+
+        Queries issued on the connection are sent without waiting for each
+        result; call ``conn.pipeline_sync()`` between dependent batches.
+        """
+        with self._get_connection() as conn:
+            with conn.pipeline():
+                yield conn
+
+    def execute_batch(self, queries):
+        """
+        Execute several SQL queries back to back in one pipeline.
+
+        Args:
+        queries (iterable): (query, params) pairs to execute in order.
+
+        Returns:
+        list: One list of dictionaries per query, in the same order.
+        """
+        cursors = []
+        with self._get_connection() as conn:
+            try:
+                with conn.pipeline():
+                    for query, params in queries:
+                        self.logger.info("Queueing query: %s", query)
+                        cursor = conn.cursor()
+                        cursor.execute(query, params)
+                        cursors.append(cursor)
+                results = [cursor.fetchall() if cursor.description else [] for cursor in cursors]
+            except Exception as e:
+                self.logger.error("Batch query execution failed: %s", e)
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                for cursor in cursors:
+                    cursor.close()
+        return results
+
     def close(self):
         """
-        Close all connections in the pool.
+        Release the shared pool, closing its connections if no other DB uses it.
         """
         if self._pool:
-            self._pool.closeall()
-            self.logger.info("Connection pool closed.")
+            with _POOLS_LOCK:
+                entry = _POOLS.get(self._pool_key)
+                last = entry is not None and entry[1] <= 1
+                if last:
+                    del _POOLS[self._pool_key]
+                elif entry is not None:
+                    entry[1] -= 1
+            if last:
+                self._pool.close()
+                self.logger.info("Connection pool closed.")
+            self._pool = None
 
 
 # Example Usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     db_config = {
         "dbname": "chinook",
         "user": "postgres",
@@ -145,6 +481,7 @@ if __name__ == "__main__":
         "port": "5432",
         "minconn": 1,
         "maxconn": 5,
+        "prepare_threshold": 0,
     }
 
     db = DB(db_config)
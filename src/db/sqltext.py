@@ -0,0 +1,163 @@
+import re
+
+# Parts of a SQL string that must never be rewritten: string literals,
+# quoted identifiers, comments and dollar-quoted bodies. Unterminated quotes
+# and comments run to the end of the text.
+_NON_CODE = re.compile(
+    r"\b[Ee]'(?:[^'\\]|\\.|'')*(?:'|\Z)"
+    r"|'(?:[^']|'')*(?:'|\Z)"
+    r'|"(?:[^"]|"")*(?:"|\Z)'
+    r"|--[^\n]*"
+    r"|/\*.*?(?:\*/|\Z)"
+    r"|\$((?:[A-Za-z_]\w*)?)\$.*?(?:\$\1\$|\Z)",
+    re.DOTALL,
+)
+_INTEGER = r"[-+]?\d+"
+_IN_LIST = re.compile(
+    rf"\b(NOT\s+)?IN\s*\(\s*({_INTEGER}(?:\s*,\s*{_INTEGER})*)\s*\)",
+    re.IGNORECASE,
+)
+_LIST_ITEM = re.compile(_INTEGER)
+
+_IDENTIFIER = r'"[^"]+"|[^\s(]+'
+_CREATE_TABLE = re.compile(rf"CREATE TABLE ({_IDENTIFIER}) \((.*?)\n\)", re.DOTALL)
+_FOREIGN_KEY = re.compile(rf"FOREIGN KEY\s*\(([^)]*)\)\s*REFERENCES\s+({_IDENTIFIER})\s*\(([^)]*)\)")
+_PRIMARY_KEY = re.compile(r"PRIMARY KEY\s*\(([^)]*)\)")
+_COLUMN = re.compile(rf"({_IDENTIFIER})\s+(.+)")
+_COLUMN_SUFFIX = re.compile(r"\s+(?:NOT NULL|NULL|DEFAULT|PRIMARY KEY|UNIQUE|CHECK)\b.*$")
+
+_SQL_FENCE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+_FENCE_OPEN = re.compile(r"```(?:sql)?\s*", re.IGNORECASE)
+# Trailing characters that may still turn out to be part of a closing fence.
+_HELD_TAIL = " \t\r\n`"
+
+
+def rewrite_in_lists(sql: str, placeholder: str = ":in_{}") -> tuple:
+    """
+    Rewrite literal integer ``IN (...)`` lists into a single array parameter.
+
+    ``x IN (1, 2, 3)`` becomes ``x = ANY(:in_1)`` and ``x NOT IN (...)`` becomes
+    ``x <> ALL(:in_1)``, so the statement shape no longer depends on the list
+    length and the server plan cache can be reused. Text inside string
+    literals, quoted identifiers and comments is never touched.
+
+    Only integer lists are rewritten: a bound list of Python strings arrives
+    as ``text[]``, which does not compare with date, uuid or enum columns the
+    way the original untyped literals did.
+
+    :param sql: SQL query string, typically generated by the LLM.
+    :param placeholder: Format string for the bind parameter, given its 1-based index.
+    :return: The rewritten SQL and the list of extracted Python lists.
+    """
+    values = []
+
+    def replace(match):
+        operator = "<> ALL" if match.group(1) else "= ANY"
+        name = placeholder.format(len(values) + 1)
+        values.append([int(item) for item in _LIST_ITEM.findall(match.group(2))])
+        return f"{operator}({name})"
+
+    parts = []
+    position = 0
+    for match in _NON_CODE.finditer(sql):
+        parts.append(_IN_LIST.sub(replace, sql[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_IN_LIST.sub(replace, sql[position:]))
+    return "".join(parts), values
+
+
+def compact_schema(table_info: str) -> str:
+    """
+    Condense ``SQLDatabase.get_table_info`` output to one line per table.
+
+    Sample rows and constraint names are dropped; columns keep their types
+    and primary/foreign keys are kept so the LLM can still plan joins, e.g.
+    ``album(album_id INTEGER, title VARCHAR(160); pk album_id; fk artist_id -> artist.artist_id)``.
+    If any table cannot be parsed, or nothing parses at all, the original
+    text is returned unchanged so the LLM never loses schema information.
+
+    :param table_info: Table info text made of CREATE TABLE statements.
+    :return: Compact schema description.
+    """
+    blocks = _CREATE_TABLE.findall(table_info)
+    if not blocks or len(blocks) != table_info.count("CREATE TABLE"):
+        return table_info
+    tables = []
+    for name, body in blocks:
+        columns, keys = [], []
+        for line in body.split("\n"):
+            line = line.strip().rstrip(",").strip()
+            if not line:
+                continue
+            foreign_key = _FOREIGN_KEY.search(line)
+            primary_key = _PRIMARY_KEY.search(line)
+            column = _COLUMN.fullmatch(line)
+            if foreign_key:
+                source, table, target = foreign_key.groups()
+                keys.append(f"fk {source} -> {table}.{target}")
+            elif primary_key:
+                keys.append(f"pk {primary_key.group(1)}")
+            elif line.startswith("CONSTRAINT"):
+                continue
+            elif column:
+                column_name, column_type = column.groups()
+                columns.append(f"{column_name} {_COLUMN_SUFFIX.sub('', column_type)}")
+            else:
+                return table_info
+        if not columns:
+            return table_info
+        tables.append(f"{name}({'; '.join([', '.join(columns)] + keys)})")
+    return "\n".join(tables)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Collapse whitespace so trivially different spellings share a cache entry.
+    """
+    return " ".join(question.split())
+
+
+def strip_sql(text: str) -> str:
+    """
+    Remove surrounding whitespace and a markdown code fence from LLM SQL output.
+    """
+    return _SQL_FENCE.sub("", text.strip())
+
+
+def _ready_prefix(text: str):
+    """
+    Part of partial LLM output that ``strip_sql`` is certain to keep, or None.
+    """
+    rest = text.lstrip()
+    if "```sql".startswith(rest.lower()):
+        return None
+    if rest.startswith("```"):
+        match = _FENCE_OPEN.match(rest)
+        if match.end() == len(rest):
+            return None
+        rest = rest[match.end():]
+    return rest.rstrip(_HELD_TAIL)
+
+
+def stream_sql(chunks):
+    """
+    Apply ``strip_sql`` to streamed LLM output while it arrives.
+
+    Text is yielded as soon as it can no longer belong to a code fence, and
+    the yielded pieces always join up to ``strip_sql("".join(chunks))``.
+
+    :param chunks: Iterable of text chunks from the LLM.
+    :return: Iterator of cleaned text chunks.
+    """
+    text = ""
+    emitted = 0
+    for chunk in chunks:
+        text += chunk
+        ready = _ready_prefix(text)
+        if ready is not None and len(ready) > emitted:
+            yield ready[emitted:]
+            emitted = len(ready)
+    final = strip_sql(text)
+    if len(final) > emitted:
+        yield final[emitted:]
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from src.db.adb import ADB
+
+
+class ADBOpenTest(unittest.TestCase):
+    def test_concurrent_open_creates_one_pool(self):
+        created = []
+
+        async def create_pool(*args, **kwargs):
+            await asyncio.sleep(0)
+            pool = mock.Mock()
+            created.append(pool)
+            return pool
+
+        async def open_concurrently(adb):
+            await asyncio.gather(*(adb.open() for _ in range(5)))
+
+        adb = ADB("postgresql://postgres@localhost/chinook")
+        with mock.patch("src.db.adb.asyncpg.create_pool", create_pool):
+            asyncio.run(open_concurrently(adb))
+
+        self.assertEqual(len(created), 1)
+        self.assertIs(adb._pool, created[0])
+
+    def test_new_event_loop_reopens_pool(self):
+        created = []
+
+        async def create_pool(*args, **kwargs):
+            pool = mock.Mock()
+            created.append(pool)
+            return pool
+
+        adb = ADB("postgresql://postgres@localhost/chinook")
+        with mock.patch("src.db.adb.asyncpg.create_pool", create_pool):
+            asyncio.run(adb.open())
+            asyncio.run(adb.open())
+
+        self.assertEqual(len(created), 2)
+        created[0].terminate.assert_called_once_with()
+        self.assertIs(adb._pool, created[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
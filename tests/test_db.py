@@ -0,0 +1,73 @@
+import inspect
+import types
+import unittest
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+from src.db import db
+from src.db.db import DB, _configure_connection, _conninfo, _connection_kwargs, session_options
+
+DB_CONFIG = {
+    "dbname": "chinook",
+    "user": "postgres",
+    "password": "postgres",
+    "host": "localhost",
+    "port": "5432",
+    "prepared_max": 64,
+    "session_settings": {"search_path": "public, app"},
+}
+
+
+class ConnectionKwargsTest(unittest.TestCase):
+    def test_libpq_kwargs_are_valid_connection_options(self):
+        connect_params = inspect.signature(psycopg.Connection.connect).parameters
+        kwargs = _connection_kwargs(DB_CONFIG)
+        libpq_kwargs = {name: value for name, value in kwargs.items() if name not in connect_params}
+
+        # Raises ProgrammingError on an option libpq does not know, e.g. prepared_max.
+        conninfo = make_conninfo(_conninfo(DB_CONFIG), **libpq_kwargs)
+
+        self.assertIn("keepalives_idle=30", conninfo)
+        self.assertNotIn("prepared_max", kwargs)
+
+    def test_configure_sets_prepared_max(self):
+        conn = types.SimpleNamespace(prepared_max=100)
+
+        _configure_connection(conn, prepared_max=DB_CONFIG["prepared_max"])
+
+        self.assertEqual(conn.prepared_max, 64)
+
+
+
+class SessionOptionsTest(unittest.TestCase):
+    def test_default_settings(self):
+        self.assertEqual(
+            session_options(),
+            "-c jit=off -c statement_timeout=30s -c application_name=rag-neo4j",
+        )
+
+    def test_spaces_and_backslashes_are_escaped(self):
+        options = session_options({"search_path": "public, app", "application_name": "a\\b"})
+
+        self.assertEqual(options, "-c search_path=public,\\ app -c application_name=a\\\\b")
+        make_conninfo(options=options)
+
+    def test_existing_options_are_kept_last(self):
+        options = session_options({"jit": "off"}, options="-c search_path=app")
+
+        self.assertEqual(options, "-c jit=off -c search_path=app")
+
+
+class DBConnectTest(unittest.TestCase):
+    def test_unreachable_server_fails_fast_with_libpq_error(self):
+        config = {**DB_CONFIG, "host": "127.0.0.1", "port": "1", "pool_timeout": 1}
+
+        with self.assertRaises(psycopg.OperationalError):
+            DB(config)
+
+        self.assertEqual(db._POOLS, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
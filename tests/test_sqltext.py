@@ -0,0 +1,131 @@
+import unittest
+
+from src.db.sqltext import compact_schema, normalize_question, rewrite_in_lists, stream_sql, strip_sql
+
+TABLE_INFO = """
+CREATE TABLE album (
+\talbum_id INTEGER NOT NULL, 
+\ttitle VARCHAR(160) NOT NULL, 
+\tartist_id INTEGER NOT NULL, 
+\tcreated TIMESTAMP WITHOUT TIME ZONE DEFAULT now(), 
+\tCONSTRAINT album_pkey PRIMARY KEY (album_id), 
+\tCONSTRAINT album_artist_id_fkey FOREIGN KEY(artist_id) REFERENCES artist (artist_id)
+)
+
+/*
+3 rows from album table:
+album_id\ttitle\tartist_id
+1\tFor Those About To Rock We Salute You\t1
+*/
+
+
+CREATE TABLE "Order Details" (
+\t"Order ID" SMALLINT NOT NULL, 
+\t"Unit Price" NUMERIC, 
+\tCONSTRAINT "Order Details_pkey" PRIMARY KEY ("Order ID"), 
+\tCONSTRAINT "Order Details_fkey" FOREIGN KEY("Order ID") REFERENCES "Sales Orders" ("Order ID")
+)
+"""
+
+
+class RewriteInListsTest(unittest.TestCase):
+    def test_list_length_does_not_change_sql(self):
+        two, two_values = rewrite_in_lists("SELECT * FROM invoice WHERE invoice_id IN (1,2)")
+        three, three_values = rewrite_in_lists("SELECT * FROM invoice WHERE invoice_id IN (1, 2, 3)")
+
+        self.assertEqual(two.encode(), three.encode())
+        self.assertEqual(two, "SELECT * FROM invoice WHERE invoice_id = ANY(:in_1)")
+        self.assertEqual(two_values, [[1, 2]])
+        self.assertEqual(three_values, [[1, 2, 3]])
+
+    def test_not_in_becomes_all(self):
+        sql, values = rewrite_in_lists("SELECT * FROM track WHERE genre_id NOT IN (1, -2)")
+
+        self.assertEqual(sql, "SELECT * FROM track WHERE genre_id <> ALL(:in_1)")
+        self.assertEqual(values, [[1, -2]])
+
+    def test_string_literal_is_untouched(self):
+        query = "SELECT * FROM orders WHERE note = 'stuck in (1, 2)' AND order_id IN (3, 4)"
+
+        sql, values = rewrite_in_lists(query)
+
+        self.assertEqual(sql, "SELECT * FROM orders WHERE note = 'stuck in (1, 2)' AND order_id = ANY(:in_1)")
+        self.assertEqual(values, [[3, 4]])
+
+    def test_identifiers_and_comments_are_untouched(self):
+        query = 'SELECT "a in (1)" FROM t -- id IN (1, 2)\n/* x IN (3) */ WHERE $$ y IN (4) $$ <> \'\''
+
+        self.assertEqual(rewrite_in_lists(query), (query, []))
+
+    def test_non_integer_lists_are_untouched(self):
+        query = (
+            "SELECT * FROM orders WHERE order_date IN ('1996-07-04', '1996-07-05') "
+            "AND freight IN (1.5, 2) AND ship_via IN (SELECT shipper_id FROM shippers)"
+        )
+
+        self.assertEqual(rewrite_in_lists(query), (query, []))
+
+    def test_placeholder_numbering(self):
+        sql, values = rewrite_in_lists("SELECT 1 WHERE a IN (1) AND b in (2, 3)", placeholder="${}")
+
+        self.assertEqual(sql, "SELECT 1 WHERE a = ANY($1) AND b = ANY($2)")
+        self.assertEqual(values, [[1], [2, 3]])
+
+
+class CompactSchemaTest(unittest.TestCase):
+    def test_one_line_per_table_with_keys(self):
+        self.assertEqual(
+            compact_schema(TABLE_INFO),
+            "album(album_id INTEGER, title VARCHAR(160), artist_id INTEGER, "
+            "created TIMESTAMP WITHOUT TIME ZONE; pk album_id; fk artist_id -> artist.artist_id)\n"
+            '"Order Details"("Order ID" SMALLINT, "Unit Price" NUMERIC; pk "Order ID"; '
+            'fk "Order ID" -> "Sales Orders"."Order ID")',
+        )
+
+    def test_unparsed_table_falls_back_to_raw_text(self):
+        table_info = TABLE_INFO + "\nCREATE TABLE broken (id INTEGER)\n"
+
+        self.assertEqual(compact_schema(table_info), table_info)
+
+    def test_custom_table_info_is_kept(self):
+        table_info = "Table customer: one row per customer, keyed by customer_id."
+
+        self.assertEqual(compact_schema(table_info), table_info)
+
+
+class StripSqlTest(unittest.TestCase):
+    RESPONSES = [
+        "SELECT 1;",
+        "  SELECT name FROM artist;\n",
+        "```sql\nSELECT * FROM album;\n```",
+        "```SQL\nSELECT `x` FROM t\n```\n",
+        "```\nSELECT 2\n```",
+        "```",
+        "",
+    ]
+
+    def test_strip_sql(self):
+        self.assertEqual(strip_sql("```sql\nSELECT * FROM album;\n```"), "SELECT * FROM album;")
+        self.assertEqual(strip_sql("  SELECT 1;  "), "SELECT 1;")
+
+    def test_stream_matches_strip_for_any_chunking(self):
+        for response in self.RESPONSES:
+            for size in range(1, len(response) + 2):
+                chunks = [response[i:i + size] for i in range(0, len(response), size)]
+                with self.subTest(response=response, size=size):
+                    self.assertEqual("".join(stream_sql(chunks)), strip_sql(response))
+
+    def test_stream_yields_before_the_end(self):
+        chunks = ["```sql\n", "SELECT *", " FROM album", ";\n```"]
+
+        pieces = list(stream_sql(chunks))
+
+        self.assertEqual(pieces[0], "SELECT *")
+        self.assertEqual("".join(pieces), "SELECT * FROM album;")
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question("  Customers in\n Brazil? "), "Customers in Brazil?")
+
+
+if __name__ == "__main__":
+    unittest.main()